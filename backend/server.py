@@ -1,26 +1,50 @@
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from brotli_asgi import BrotliMiddleware
+from bson import ObjectId
+import orjson
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage backend: MongoDB when configured, otherwise local NDJSON logs
+from storage import LocalStorage, MongoStorage
+
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo' if os.environ.get('MONGO_URL') else 'local')
+if STORAGE_BACKEND == 'mongo':
+    storage = MongoStorage(os.environ['MONGO_URL'], os.environ['DB_NAME'])
+else:
+    storage = LocalStorage(Path(os.environ.get('LOCAL_DATA_DIR', ROOT_DIR.parent / 'data')))
+
+
+class APIJSONResponse(ORJSONResponse):
+    """orjson response that also encodes Mongo ObjectIds.
+
+    Returning this directly from a route skips FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=self.encode_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    @staticmethod
+    def encode_default(obj):
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        raise TypeError
+
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=APIJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -44,17 +68,14 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    await storage.insert_status_check(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
+    status_checks = await storage.list_status_checks(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
-# Include the router in the main app
-app.include_router(api_router)
-
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -63,6 +84,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+
+class AcceptEncodingMiddleware:
+    """Drop codings refused with ``q=0`` from Accept-Encoding.
+
+    BrotliMiddleware only checks whether "br" or "gzip" appears in the header,
+    so ``br;q=0`` would still get brotli. Other q-values are not ranked: any
+    accepted br wins over gzip.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = []
+            for name, value in scope["headers"]:
+                if name == b"accept-encoding":
+                    value = b", ".join(self.accepted_codings(value))
+                headers.append((name, value))
+            scope = dict(scope, headers=headers)
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def accepted_codings(value: bytes):
+        for item in value.split(b","):
+            coding, *params = [part.strip() for part in item.split(b";")]
+            refused = False
+            for param in params:
+                key, _, weight = param.partition(b"=")
+                if key.strip().lower() == b"q":
+                    try:
+                        refused = float(weight) == 0
+                    except ValueError:
+                        refused = True
+            if coding and not refused:
+                yield coding
+
+
+# Negotiates br or gzip from Accept-Encoding; small bodies are sent as-is
+app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
+app.add_middleware(AcceptEncodingMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -70,15 +134,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def setup_storage():
+    await storage.setup()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    storage.close()
 
 # Add these imports at the top (if not already there)
 from fastapi import File, UploadFile, Form
 from typing import Optional
 import shutil
-from bson import ObjectId
+import asyncio
+from bson.errors import InvalidId
+from typing import Literal
 
 # Add these new endpoints after your existing ones
 
@@ -124,7 +194,6 @@ async def create_story(
             "culturalContext": culturalContext,
             "submissionType": submissionType,
             "status": "pending",
-            "created_at": datetime.utcnow(),
             "listeners": 0,
             "rating": 0
         }
@@ -152,13 +221,17 @@ async def create_story(
         story_doc["audioFiles"] = audio_paths
         story_doc["imageFiles"] = image_paths
         
+        # Stamp after the uploads are saved: the moderation feed cursor is
+        # created_at, so a slow upload must not land behind a newer story
+        story_doc["created_at"] = datetime.utcnow()
+
         # Insert into database
-        result = await db.stories.insert_one(story_doc)
+        story_id = await storage.insert_story(story_doc)
         
         return {
             "success": True,
             "message": "Story submitted successfully",
-            "story_id": str(result.inserted_id)
+            "story_id": story_id
         }
         
     except Exception as e:
@@ -170,20 +243,23 @@ async def create_story(
 
 # 2. Get all stories
 @api_router.get("/stories")
-async def get_stories(limit: int = 50, skip: int = 0):
-    stories = await db.stories.find().skip(skip).limit(limit).to_list(limit)
-    # Convert ObjectId to string
-    for story in stories:
-        story["_id"] = str(story["_id"])
-    return stories
+async def get_stories(
+    limit: int = 50,
+    skip: int = 0,
+    culture: Optional[str] = None,
+    status: Optional[str] = None
+):
+    filters = {"culture": culture, "status": status}
+    filters = {field: value for field, value in filters.items() if value is not None}
+    stories = await storage.list_stories(skip, limit, filters)
+    return APIJSONResponse(stories)
 
 # 3. Get single story
 @api_router.get("/stories/{story_id}")
 async def get_story(story_id: str):
-    story = await db.stories.find_one({"_id": ObjectId(story_id)})
+    story = await storage.get_story(story_id)
     if story:
-        story["_id"] = str(story["_id"])
-        return story
+        return APIJSONResponse(story)
     return {"error": "Story not found"}
 
 # 4. Contact endpoint
@@ -199,9 +275,188 @@ async def submit_contact(
         "message": message,
         "created_at": datetime.utcnow()
     }
-    result = await db.contacts.insert_one(contact_doc)
+    contact_id = await storage.insert_contact(contact_doc)
     return {
         "success": True,
         "message": "Message sent successfully",
-        "contact_id": str(result.inserted_id)
-    }
\ No newline at end of file
+        "contact_id": contact_id
+    }
+
+# 5. Moderation queue
+from storage import MODERATION_BATCH_SIZE
+
+FEED_POLL_INTERVAL = 1.0
+MAX_FEED_TIMEOUT = 30
+# created_at is stamped before the insert lands, so concurrent submissions can
+# become visible out of order; the feed stays this far behind the clock
+FEED_GRACE = timedelta(seconds=5)
+
+
+class ModerationDecision(BaseModel):
+    story_id: str
+    status: Literal["approved", "rejected"]
+    note: Optional[str] = None
+
+class ModerationBatch(BaseModel):
+    decisions: List[ModerationDecision]
+
+
+def encode_cursor(story):
+    return f"{story['created_at'].isoformat()}|{story['_id']}"
+
+def decode_cursor(cursor):
+    created_at, story_id = cursor.split("|", 1)
+    created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is not None:
+        # Stored timestamps are naive UTC
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at, str(ObjectId(story_id))
+
+async def find_pending(cursor: Optional[str], limit: int, until: Optional[datetime] = None):
+    after = decode_cursor(cursor) if cursor else None
+    stories = await storage.list_pending(after, limit, until)
+    next_cursor = encode_cursor(stories[-1]) if stories else cursor
+    return stories, next_cursor
+
+
+@api_router.get("/moderation/queue")
+async def get_moderation_queue(limit: int = 50, cursor: Optional[str] = None):
+    limit = max(1, min(limit, MODERATION_BATCH_SIZE))
+    try:
+        stories, next_cursor = await find_pending(cursor, limit)
+    except (ValueError, InvalidId):
+        return {"error": "Invalid cursor"}
+    return APIJSONResponse({
+        "stories": stories,
+        "next_cursor": next_cursor if len(stories) == limit else None
+    })
+
+@api_router.post("/moderation/stories")
+async def moderate_stories(batch: ModerationBatch):
+    updates = []
+    invalid_ids = []
+    for decision in batch.decisions:
+        if not ObjectId.is_valid(decision.story_id):
+            invalid_ids.append(decision.story_id)
+            continue
+        updates.append((decision.story_id, {
+            "status": decision.status,
+            "moderation_note": decision.note,
+            "moderated_at": datetime.utcnow()
+        }))
+
+    modified = await storage.update_stories(updates)
+
+    if modified:
+        snapshot_stale.set()
+
+    return {
+        "success": True,
+        "modified": modified,
+        "skipped": len(updates) - modified,
+        "invalid_ids": invalid_ids
+    }
+
+@api_router.get("/moderation/feed")
+async def moderation_feed(cursor: Optional[str] = None, timeout: int = 25, limit: int = 100):
+    """Long-poll for new pending submissions after the given cursor.
+
+    Without a cursor the feed starts from now, so clients only see new work.
+    Stories show up FEED_GRACE after their created_at, once any submission
+    stamped earlier has had time to land.
+    """
+    timeout = max(0, min(timeout, MAX_FEED_TIMEOUT))
+    limit = max(1, min(limit, MODERATION_BATCH_SIZE))
+    if cursor is None:
+        cursor = f"{datetime.utcnow().isoformat()}|{ObjectId('0' * 24)}"
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            stories, next_cursor = await find_pending(cursor, limit, datetime.utcnow() - FEED_GRACE)
+        except (ValueError, InvalidId):
+            return {"error": "Invalid cursor"}
+        if stories or loop.time() >= deadline:
+            return APIJSONResponse({"stories": stories, "cursor": next_cursor})
+        await asyncio.sleep(FEED_POLL_INTERVAL)
+
+# 6. Analytics over the columnar story snapshot
+from fastapi import Request
+from story_snapshot import CATEGORICAL_FIELDS, NUMERIC_FIELDS, StorySnapshot, build_snapshot
+
+SNAPSHOT_DIR = Path(os.environ.get('SNAPSHOT_DIR', ROOT_DIR / 'snapshots' / 'stories'))
+SNAPSHOT_INTERVAL = int(os.environ.get('SNAPSHOT_INTERVAL', 300))
+
+story_snapshot: Optional[StorySnapshot] = None
+snapshot_stale = asyncio.Event()
+snapshot_task: Optional[asyncio.Task] = None
+
+
+async def refresh_snapshot():
+    global story_snapshot
+    version_dir = await build_snapshot(storage, SNAPSHOT_DIR)
+    story_snapshot = StorySnapshot(version_dir)
+    logger.info(f"Story snapshot {story_snapshot.version}: {story_snapshot.size} stories")
+
+async def snapshot_loop():
+    # Rebuild periodically, or sooner when moderation changes story status
+    while True:
+        # Clear first so a status change during the rebuild triggers another one
+        snapshot_stale.clear()
+        try:
+            await refresh_snapshot()
+        except Exception as e:
+            logger.error(f"Story snapshot failed: {e}")
+        try:
+            await asyncio.wait_for(snapshot_stale.wait(), SNAPSHOT_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+def snapshot_filters(request: Request):
+    return {
+        field: value for field, value in request.query_params.items()
+        if field in CATEGORICAL_FIELDS
+    }
+
+
+@app.on_event("startup")
+async def start_snapshot_job():
+    global story_snapshot, snapshot_task
+    story_snapshot = StorySnapshot.load(SNAPSHOT_DIR)
+    snapshot_task = asyncio.create_task(snapshot_loop())
+
+@app.on_event("shutdown")
+async def stop_snapshot_job():
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+
+@api_router.get("/analytics/facets")
+async def get_facets(request: Request, fields: str = "culture,language,region,category"):
+    if story_snapshot is None:
+        return {"error": "Snapshot not ready"}
+    fields = [field for field in fields.split(",") if field in CATEGORICAL_FIELDS]
+    return {
+        "version": story_snapshot.version,
+        "facets": story_snapshot.facets(fields, snapshot_filters(request))
+    }
+
+@api_router.get("/analytics/histogram")
+async def get_histogram(request: Request, field: str = "created_at", bins: int = 20):
+    if story_snapshot is None:
+        return {"error": "Snapshot not ready"}
+    if field not in NUMERIC_FIELDS:
+        return {"error": f"Unknown field: {field}"}
+    return {
+        "version": story_snapshot.version,
+        "field": field,
+        **story_snapshot.histogram(field, max(1, min(bins, 1000)), snapshot_filters(request))
+    }
+
+@api_router.post("/analytics/snapshot")
+async def rebuild_snapshot():
+    await refresh_snapshot()
+    return {"success": True, "version": story_snapshot.version, "stories": story_snapshot.size}
+
+# Include the router in the main app
+app.include_router(api_router)
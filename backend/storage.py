@@ -0,0 +1,413 @@
+"""Storage backends for stories, contacts and status checks.
+
+``MongoStorage`` is the production backend. ``LocalStorage`` keeps each
+collection in an append-only NDJSON log under ``data/`` and serves reads from
+in-memory indexes, so offline deployments and tests do not need a Mongo server.
+"""
+import asyncio
+import bisect
+import fcntl
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# (created_at, story_id) position in the pending queue
+Cursor = Tuple[datetime, str]
+
+# Full story text is not needed to triage the queue
+QUEUE_EXCLUDED_FIELDS = ("storyText", "culturalContext")
+
+MODERATION_BATCH_SIZE = 1000
+ITER_BATCH_SIZE = 1000
+
+
+class Storage(ABC):
+    async def setup(self):
+        pass
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    async def insert_story(self, story: dict) -> str:
+        ...
+
+    @abstractmethod
+    async def get_story(self, story_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list_stories(self, skip: int, limit: int, filters: Dict[str, str]) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def list_pending(
+        self, after: Optional[Cursor], limit: int, until: Optional[datetime] = None
+    ) -> List[dict]:
+        """Pending stories ordered by (created_at, _id), strictly after ``after``
+        and, when given, created no later than ``until``."""
+
+    @abstractmethod
+    async def update_stories(self, updates: List[Tuple[str, dict]]) -> int:
+        """Apply ``$set``-style updates to stories that are still pending."""
+
+    @abstractmethod
+    def iter_stories(self, fields: List[str]) -> AsyncIterator[dict]:
+        ...
+
+    @abstractmethod
+    async def insert_contact(self, contact: dict) -> str:
+        ...
+
+    @abstractmethod
+    async def insert_status_check(self, status_check: dict):
+        ...
+
+    @abstractmethod
+    async def list_status_checks(self, limit: int) -> List[dict]:
+        ...
+
+
+class MongoStorage(Storage):
+    def __init__(self, mongo_url: str, db_name: str):
+        self.client = AsyncIOMotorClient(mongo_url)
+        self.db = self.client[db_name]
+
+    async def setup(self):
+        # Backs the pending-queue listing and the change feed cursor
+        await self.db.stories.create_index(
+            [("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]
+        )
+
+    def close(self):
+        self.client.close()
+
+    async def insert_story(self, story):
+        result = await self.db.stories.insert_one(story)
+        return str(result.inserted_id)
+
+    async def get_story(self, story_id):
+        try:
+            return await self.db.stories.find_one({"_id": ObjectId(story_id)})
+        except InvalidId:
+            return None
+
+    async def list_stories(self, skip, limit, filters):
+        return await self.db.stories.find(filters) \
+            .sort([("created_at", ASCENDING), ("_id", ASCENDING)]) \
+            .skip(skip).limit(limit).to_list(limit)
+
+    async def list_pending(self, after, limit, until=None):
+        query = {"status": "pending"}
+        if until:
+            query["created_at"] = {"$lte": until}
+        if after:
+            created_at, story_id = after
+            query["$or"] = [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "_id": {"$gt": ObjectId(story_id)}},
+            ]
+        projection = {field: 0 for field in QUEUE_EXCLUDED_FIELDS}
+        return await self.db.stories.find(query, projection) \
+            .sort([("created_at", ASCENDING), ("_id", ASCENDING)]) \
+            .limit(limit).to_list(limit)
+
+    async def update_stories(self, updates):
+        operations = [
+            UpdateOne({"_id": ObjectId(story_id), "status": "pending"}, {"$set": fields})
+            for story_id, fields in updates
+        ]
+        modified = 0
+        for start in range(0, len(operations), MODERATION_BATCH_SIZE):
+            result = await self.db.stories.bulk_write(
+                operations[start:start + MODERATION_BATCH_SIZE], ordered=False
+            )
+            modified += result.modified_count
+        return modified
+
+    async def iter_stories(self, fields):
+        projection = {field: 1 for field in fields}
+        async for story in self.db.stories.find({}, projection, batch_size=5000):
+            yield story
+
+    async def insert_contact(self, contact):
+        result = await self.db.contacts.insert_one(contact)
+        return str(result.inserted_id)
+
+    async def insert_status_check(self, status_check):
+        await self.db.status_checks.insert_one(status_check)
+
+    async def list_status_checks(self, limit):
+        return await self.db.status_checks.find().to_list(limit)
+
+
+class AppendOnlyLog:
+    """An NDJSON log of ``put``/``update`` records replayed into a dict.
+
+    Each write call is appended and fsynced once, off the event loop. Once
+    superseded records reach ``COMPACT_MIN_RECORDS`` the log is rewritten with
+    one ``put`` per document. The in-memory state is only valid for a single
+    process, so an exclusive lock file guards the log.
+    """
+
+    DATETIME_FIELDS = ("created_at", "moderated_at", "timestamp")
+    COMPACT_MIN_RECORDS = 1000
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.docs: Dict[str, dict] = {}
+        self.records = 0
+        # Serializes appends and compaction; hold it across any read-then-write
+        self.lock = asyncio.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_file = open(self.path.with_suffix(".lock"), "wb")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock_file.close()
+            raise RuntimeError(
+                f"{self.path} is in use by another process; "
+                "the local storage backend supports a single worker"
+            )
+        try:
+            self.replay()
+            self.file = open(self.path, "ab", buffering=0)
+        except BaseException:
+            self.lock_file.close()
+            raise
+        if self.needs_compaction():
+            self.try_compact()
+
+    @classmethod
+    def decode(cls, doc):
+        for field in cls.DATETIME_FIELDS:
+            if isinstance(doc.get(field), str):
+                doc[field] = datetime.fromisoformat(doc[field])
+        return doc
+
+    def replay(self):
+        if not self.path.exists():
+            return
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    offset += len(line)
+                    continue
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    if line.endswith(b"\n"):
+                        raise ValueError(f"Corrupt record at {self.path}:{line_number}")
+                    # Only the final line can lack a newline: a torn write after
+                    # a crash, so drop it and let new records start cleanly
+                    logger.warning(f"Truncating torn record at {self.path}:{line_number}")
+                    os.truncate(self.path, offset)
+                    break
+                self.apply(record["op"], record["id"], self.decode(record["doc"]))
+                offset += len(line)
+                if not line.endswith(b"\n"):
+                    # Complete record that lost only its newline
+                    with open(self.path, "ab") as tail:
+                        tail.write(b"\n")
+
+    def apply(self, op, doc_id, doc):
+        if op == "put":
+            self.docs[doc_id] = doc
+        elif doc_id in self.docs:
+            self.docs[doc_id].update(doc)
+        self.records += 1
+
+    def needs_compaction(self):
+        return self.records - len(self.docs) >= self.COMPACT_MIN_RECORDS
+
+    def _append(self, records):
+        data = b"".join(
+            orjson.dumps({"op": op, "id": doc_id, "doc": doc}, option=orjson.OPT_APPEND_NEWLINE)
+            for op, doc_id, doc in records
+        )
+        fd = self.file.fileno()
+        size = os.fstat(fd).st_size
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[self.file.write(view):]
+            os.fsync(fd)
+        except OSError:
+            # Leave no fragment behind for the next append to run into
+            os.ftruncate(fd, size)
+            raise
+
+    async def append(self, records: List[Tuple[str, str, dict]], on_commit=None):
+        """Persist and apply ``records``; the caller must hold ``self.lock``.
+
+        ``on_commit`` runs once the records are durable, before compaction.
+        """
+        if not records:
+            return
+        await asyncio.to_thread(self._append, records)
+        for op, doc_id, doc in records:
+            self.apply(op, doc_id, doc)
+        if on_commit:
+            on_commit()
+        if self.needs_compaction():
+            await asyncio.to_thread(self.try_compact)
+
+    async def write(self, records: List[Tuple[str, str, dict]], on_commit=None):
+        async with self.lock:
+            await self.append(records, on_commit)
+
+    def try_compact(self):
+        # Compaction only saves space; the appended log stays valid if it fails
+        try:
+            self.compact()
+        except Exception:
+            logger.exception(f"Compaction of {self.path} failed")
+
+    def compact(self):
+        tmp_path = self.path.with_suffix(".compact")
+        try:
+            with open(tmp_path, "wb") as f:
+                for doc_id, doc in list(self.docs.items()):
+                    f.write(orjson.dumps(
+                        {"op": "put", "id": doc_id, "doc": doc}, option=orjson.OPT_APPEND_NEWLINE
+                    ))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        # The old handle now points at the replaced inode
+        old_file, self.file = self.file, open(self.path, "ab", buffering=0)
+        old_file.close()
+        self.records = len(self.docs)
+        dir_fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def close(self):
+        self.file.close()
+        self.lock_file.close()
+
+
+class LocalStorage(Storage):
+    def __init__(self, data_dir: Path):
+        logs = []
+        try:
+            for path in ("stories/stories.ndjson", "contacts/contacts.ndjson", "status/status_checks.ndjson"):
+                logs.append(AppendOnlyLog(data_dir / path))
+        except BaseException:
+            for log in logs:
+                log.close()
+            raise
+        self.stories, self.contacts, self.status_checks = logs
+
+        # Story indexes, all in (created_at, id) order; stories are never deleted
+        self.by_created: List[Cursor] = sorted(
+            (story["created_at"], story_id) for story_id, story in self.stories.docs.items()
+        )
+        self.by_culture: Dict[str, List[Cursor]] = {}
+        for key in self.by_created:
+            self.by_culture.setdefault(self.stories.docs[key[1]]["culture"], []).append(key)
+
+    def close(self):
+        for log in (self.stories, self.contacts, self.status_checks):
+            log.close()
+
+    def index_story(self, story_id, story):
+        key = (story["created_at"], story_id)
+        bisect.insort(self.by_created, key)
+        bisect.insort(self.by_culture.setdefault(story["culture"], []), key)
+
+    async def insert_story(self, story):
+        story_id = str(ObjectId())
+        story["_id"] = story_id
+        await self.stories.write(
+            [("put", story_id, story)], on_commit=lambda: self.index_story(story_id, story)
+        )
+        return story_id
+
+    async def get_story(self, story_id):
+        story = self.stories.docs.get(story_id)
+        return dict(story) if story else None
+
+    async def list_stories(self, skip, limit, filters):
+        filters = dict(filters)
+        if "culture" in filters:
+            keys = self.by_culture.get(filters.pop("culture"), [])
+        else:
+            keys = self.by_created
+
+        stories = []
+        for _, story_id in keys:
+            story = self.stories.docs[story_id]
+            if all(story.get(field) == value for field, value in filters.items()):
+                if skip:
+                    skip -= 1
+                    continue
+                stories.append(dict(story))
+                if len(stories) == limit:
+                    break
+        return stories
+
+    async def list_pending(self, after, limit, until=None):
+        start = bisect.bisect_right(self.by_created, after) if after else 0
+        stories = []
+        for position in range(start, len(self.by_created)):
+            created_at, story_id = self.by_created[position]
+            if until and created_at > until:
+                break
+            story = self.stories.docs[story_id]
+            if story["status"] == "pending":
+                stories.append({
+                    field: value for field, value in story.items()
+                    if field not in QUEUE_EXCLUDED_FIELDS
+                })
+                if len(stories) == limit:
+                    break
+        return stories
+
+    async def update_stories(self, updates):
+        async with self.stories.lock:
+            records = []
+            seen = set()
+            for story_id, fields in updates:
+                story = self.stories.docs.get(story_id)
+                if story and story["status"] == "pending" and story_id not in seen:
+                    seen.add(story_id)
+                    records.append(("update", story_id, fields))
+            await self.stories.append(records)
+        return len(records)
+
+    async def iter_stories(self, fields):
+        for count, story in enumerate(list(self.stories.docs.values()), 1):
+            yield {field: story.get(field) for field in fields}
+            if count % ITER_BATCH_SIZE == 0:
+                # Let requests run during long scans such as snapshot rebuilds
+                await asyncio.sleep(0)
+
+    async def insert_contact(self, contact):
+        contact_id = str(ObjectId())
+        contact["_id"] = contact_id
+        await self.contacts.write([("put", contact_id, contact)])
+        return contact_id
+
+    async def insert_status_check(self, status_check):
+        await self.status_checks.write([("put", status_check["id"], status_check)])
+
+    async def list_status_checks(self, limit):
+        return list(self.status_checks.docs.values())[:limit]
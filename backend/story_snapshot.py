@@ -0,0 +1,142 @@
+"""Columnar snapshot of story metadata for in-process analytics.
+
+Each snapshot is a directory of NumPy column files. Categorical fields are
+dictionary encoded (int32 codes + a JSON vocabulary), so facet counts are a
+single ``np.bincount`` over a memory-mapped array and never touch the database.
+"""
+import calendar
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+CATEGORICAL_FIELDS = ["culture", "language", "region", "category", "ageGroup", "difficulty", "status"]
+NUMERIC_FIELDS = ["created_at", "listeners", "rating"]
+NUMERIC_DTYPES = {"created_at": np.int64, "listeners": np.int64, "rating": np.float32}
+
+CURRENT_FILE = "CURRENT"
+
+# Facet label for stories with no value; real "unknown" values are merged in
+MISSING_LABEL = "unknown"
+
+logger = logging.getLogger(__name__)
+
+
+def _numeric_value(field, value):
+    if field == "created_at":
+        # Stored datetimes are naive UTC; timestamp() would read them as local time
+        return calendar.timegm(value.utctimetuple()) if isinstance(value, datetime) else 0
+    return value if isinstance(value, (int, float)) else 0
+
+
+async def build_snapshot(storage, snapshot_dir: Path) -> Path:
+    """Stream story metadata out of storage and write a new snapshot version."""
+    vocabularies: Dict[str, Dict[str, int]] = {field: {} for field in CATEGORICAL_FIELDS}
+    codes: Dict[str, List[int]] = {field: [] for field in CATEGORICAL_FIELDS}
+    numbers: Dict[str, list] = {field: [] for field in NUMERIC_FIELDS}
+
+    async for story in storage.iter_stories(CATEGORICAL_FIELDS + NUMERIC_FIELDS):
+        for field in CATEGORICAL_FIELDS:
+            value = story.get(field) or ""
+            vocabulary = vocabularies[field]
+            codes[field].append(vocabulary.setdefault(value, len(vocabulary)))
+        for field in NUMERIC_FIELDS:
+            numbers[field].append(_numeric_value(field, story.get(field)))
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    version = f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}"
+    version_dir = snapshot_dir / version
+    version_dir.mkdir()
+    for field in CATEGORICAL_FIELDS:
+        np.save(version_dir / f"{field}.npy", np.asarray(codes[field], dtype=np.int32))
+        with open(version_dir / f"{field}.json", "w") as f:
+            json.dump(list(vocabularies[field]), f)
+    for field in NUMERIC_FIELDS:
+        np.save(version_dir / f"{field}.npy", np.asarray(numbers[field], dtype=NUMERIC_DTYPES[field]))
+
+    # Swap the pointer atomically, then drop versions nobody will open again.
+    # Readers that still hold memory maps of old files keep working on Linux.
+    tmp_pointer = snapshot_dir / f"{CURRENT_FILE}.tmp"
+    tmp_pointer.write_text(version)
+    os.replace(tmp_pointer, snapshot_dir / CURRENT_FILE)
+    for old in snapshot_dir.iterdir():
+        if old.is_dir() and old.name != version:
+            shutil.rmtree(old, ignore_errors=True)
+    return version_dir
+
+
+class StorySnapshot:
+    """Read-only, memory-mapped view of one snapshot version."""
+
+    def __init__(self, version_dir: Path):
+        self.version = version_dir.name
+        self.columns = {
+            field: np.load(version_dir / f"{field}.npy", mmap_mode="r")
+            for field in CATEGORICAL_FIELDS + NUMERIC_FIELDS
+        }
+        self.vocabularies = {}
+        for field in CATEGORICAL_FIELDS:
+            with open(version_dir / f"{field}.json") as f:
+                self.vocabularies[field] = json.load(f)
+        self.size = len(self.columns["created_at"])
+
+    @classmethod
+    def load(cls, snapshot_dir: Path) -> Optional["StorySnapshot"]:
+        pointer = snapshot_dir / CURRENT_FILE
+        if not pointer.exists():
+            return None
+        try:
+            return cls(snapshot_dir / pointer.read_text().strip())
+        except (OSError, ValueError) as e:
+            # Missing or half-written version; the snapshot job will rebuild it
+            logger.error(f"Could not load story snapshot from {snapshot_dir}: {e}")
+            return None
+
+    def mask(self, filters: Dict[str, str]):
+        """Boolean row mask for equality filters on categorical fields."""
+        if not filters:
+            return slice(None)
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in filters.items():
+            vocabulary = self.vocabularies[field]
+            # Match facets, which report empty values under MISSING_LABEL
+            matches = [value, ""] if value == MISSING_LABEL else [value]
+            codes = [vocabulary.index(match) for match in matches if match in vocabulary]
+            if not codes:
+                return np.zeros(self.size, dtype=bool)
+            mask &= np.isin(self.columns[field], codes)
+        return mask
+
+    def facets(self, fields: List[str], filters: Dict[str, str]):
+        mask = self.mask(filters)
+        result = {}
+        for field in fields:
+            vocabulary = self.vocabularies[field]
+            counts = np.bincount(self.columns[field][mask], minlength=len(vocabulary))
+            result[field] = {}
+            for value, count in zip(vocabulary, counts):
+                if count:
+                    label = value or MISSING_LABEL
+                    result[field][label] = result[field].get(label, 0) + int(count)
+        return result
+
+    def histogram(self, field: str, bins: int, filters: Dict[str, str]):
+        values = self.columns[field][self.mask(filters)]
+        if field == "created_at":
+            values = values[values > 0]
+        if not len(values):
+            return {"counts": [], "edges": []}
+        counts, edges = np.histogram(values, bins=bins)
+        if field == "created_at":
+            edges = [
+                datetime.fromtimestamp(edge, timezone.utc).replace(tzinfo=None).isoformat()
+                for edge in edges
+            ]
+        else:
+            edges = [float(edge) for edge in edges]
+        return {"counts": counts.tolist(), "edges": edges}
@@ -0,0 +1,32 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py picks its storage backend at import time; keep it off Mongo and
+# away from the real data/ directory
+_import_dir = tempfile.mkdtemp()
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_DATA_DIR"] = str(Path(_import_dir) / "data")
+os.environ["SNAPSHOT_DIR"] = str(Path(_import_dir) / "snapshots")
+
+
+def pytest_sessionfinish(session):
+    server = sys.modules.get("server")
+    if server is not None:
+        server.storage.close()
+    shutil.rmtree(_import_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    from storage import LocalStorage
+    storage = LocalStorage(tmp_path / "data")
+    yield storage
+    storage.close()
@@ -0,0 +1,25 @@
+import asyncio
+
+import server
+
+
+def test_status_change_during_rebuild_triggers_another(monkeypatch):
+    rebuilds = []
+
+    async def refresh():
+        rebuilds.append(len(rebuilds))
+        if len(rebuilds) == 1:
+            # Moderation lands while the first rebuild is scanning
+            server.snapshot_stale.set()
+
+    async def run():
+        monkeypatch.setattr(server, "snapshot_stale", asyncio.Event())
+        monkeypatch.setattr(server, "refresh_snapshot", refresh)
+        monkeypatch.setattr(server, "SNAPSHOT_INTERVAL", 60)
+        task = asyncio.create_task(server.snapshot_loop())
+        for _ in range(10):
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(rebuilds) == 2
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client(local_storage, monkeypatch):
+    monkeypatch.setattr(server, "storage", local_storage)
+    return TestClient(server.app)
+
+
+def add_stories(storage, count, start=datetime(2026, 1, 1)):
+    ids = []
+    for i in range(count):
+        story = {
+            "title": f"Story {i}",
+            "culture": "Maori",
+            "status": "pending",
+            "storyText": "Once upon a time",
+            "created_at": start + timedelta(minutes=i),
+        }
+        ids.append(asyncio.run(storage.insert_story(story)))
+    return ids
+
+
+def test_queue_pages_by_created_at_cursor(client, local_storage):
+    ids = add_stories(local_storage, 5)
+
+    first = client.get("/api/moderation/queue", params={"limit": 2}).json()
+    assert [story["_id"] for story in first["stories"]] == ids[:2]
+    assert "storyText" not in first["stories"][0]
+
+    second = client.get("/api/moderation/queue", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [story["_id"] for story in second["stories"]] == ids[2:4]
+
+    last = client.get("/api/moderation/queue", params={"limit": 2, "cursor": second["next_cursor"]}).json()
+    assert [story["_id"] for story in last["stories"]] == ids[4:]
+    assert last["next_cursor"] is None
+
+
+def test_queue_rejects_malformed_cursor(client):
+    response = client.get("/api/moderation/queue", params={"cursor": "not-a-cursor"})
+    assert response.json() == {"error": "Invalid cursor"}
+
+
+def test_bulk_moderation_counts(client, local_storage):
+    ids = add_stories(local_storage, 3)
+    decisions = [
+        {"story_id": ids[0], "status": "approved"},
+        {"story_id": ids[1], "status": "rejected", "note": "Duplicate"},
+        {"story_id": str(ObjectId()), "status": "approved"},
+        {"story_id": "bogus", "status": "approved"},
+    ]
+
+    result = client.post("/api/moderation/stories", json={"decisions": decisions}).json()
+    assert result == {"success": True, "modified": 2, "skipped": 1, "invalid_ids": ["bogus"]}
+
+    # Already moderated stories are left alone
+    again = client.post("/api/moderation/stories", json={"decisions": decisions[:1]}).json()
+    assert again["modified"] == 0 and again["skipped"] == 1
+
+    queue = client.get("/api/moderation/queue").json()
+    assert [story["_id"] for story in queue["stories"]] == ids[2:]
+    assert local_storage.stories.docs[ids[1]]["moderation_note"] == "Duplicate"
+
+
+def test_feed_times_out_with_unchanged_cursor(client, local_storage, monkeypatch):
+    monkeypatch.setattr(server, "FEED_POLL_INTERVAL", 0.05)
+    add_stories(local_storage, 1)
+    story = client.get("/api/moderation/queue").json()["stories"][0]
+    cursor = f"{story['created_at']}|{story['_id']}"
+
+    started = time.monotonic()
+    result = client.get("/api/moderation/feed", params={"cursor": cursor, "timeout": 1}).json()
+    assert time.monotonic() - started >= 1
+    assert result == {"stories": [], "cursor": cursor}
+
+
+def test_feed_returns_new_submissions(client, local_storage):
+    ids = add_stories(local_storage, 2)
+    cursor = f"{datetime(2026, 1, 1).isoformat()}|{ids[0]}"
+    result = client.get("/api/moderation/feed", params={"cursor": cursor, "timeout": 0}).json()
+    assert [story["_id"] for story in result["stories"]] == ids[1:]
+
+
+def test_queue_accepts_timezone_aware_cursor(client, local_storage):
+    ids = add_stories(local_storage, 3)
+    cursor = f"2026-01-01T00:01:00+00:00|{ids[1]}"
+    result = client.get("/api/moderation/queue", params={"cursor": cursor}).json()
+    assert [story["_id"] for story in result["stories"]] == ids[2:]
+
+    # Same instant expressed in another offset
+    cursor = f"2026-01-01T01:01:00+01:00|{ids[1]}"
+    result = client.get("/api/moderation/queue", params={"cursor": cursor}).json()
+    assert [story["_id"] for story in result["stories"]] == ids[2:]
+
+
+def test_feed_waits_for_out_of_order_inserts(client, local_storage, monkeypatch):
+    monkeypatch.setattr(server, "FEED_GRACE", timedelta(seconds=1))
+    now = datetime.utcnow()
+    cursor = f"{(now - timedelta(minutes=1)).isoformat()}|{ObjectId('0' * 24)}"
+
+    # Stamped later but inserted first: still inside the grace window
+    later = asyncio.run(local_storage.insert_story({"status": "pending", "culture": "Sami", "created_at": now}))
+    result = client.get("/api/moderation/feed", params={"cursor": cursor, "timeout": 0}).json()
+    assert result == {"stories": [], "cursor": cursor}
+
+    # The slower submission lands behind it and must not be skipped
+    earlier = asyncio.run(local_storage.insert_story(
+        {"status": "pending", "culture": "Sami", "created_at": now - timedelta(milliseconds=500)}
+    ))
+    time.sleep(1)
+    result = client.get("/api/moderation/feed", params={"cursor": cursor, "timeout": 0}).json()
+    assert [story["_id"] for story in result["stories"]] == [earlier, later]
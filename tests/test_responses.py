@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+from datetime import datetime
+
+import brotli
+import orjson
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+import server
+from server import APIJSONResponse
+
+
+@pytest.fixture
+def client(local_storage, monkeypatch):
+    monkeypatch.setattr(server, "storage", local_storage)
+    return TestClient(server.app)
+
+
+def add_story(storage, text="Once upon a time " * 200):
+    story = {
+        "title": "The Rainbow Serpent",
+        "culture": "Aboriginal",
+        "status": "approved",
+        "storyText": text,
+        "created_at": datetime(2026, 1, 1, 12, 30),
+    }
+    return asyncio.run(storage.insert_story(story))
+
+
+def raw_body(client, path, accept_encoding):
+    # Read undecoded bytes so the negotiated Content-Encoding can be asserted
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response.headers.get("content-encoding"), b"".join(response.iter_raw())
+
+
+def test_encodes_object_id_and_datetime():
+    story_id = ObjectId()
+    body = APIJSONResponse({"_id": story_id, "created_at": datetime(2026, 1, 1, 12, 30)}).body
+    assert orjson.loads(body) == {"_id": str(story_id), "created_at": "2026-01-01T12:30:00"}
+
+
+def test_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        APIJSONResponse({"value": object()})
+
+
+def test_prefers_brotli(client, local_storage):
+    add_story(local_storage)
+    encoding, body = raw_body(client, "/api/stories", "gzip, br")
+    assert encoding == "br"
+    assert orjson.loads(brotli.decompress(body))[0]["title"] == "The Rainbow Serpent"
+
+
+def test_falls_back_to_gzip(client, local_storage):
+    add_story(local_storage)
+    encoding, body = raw_body(client, "/api/stories", "gzip")
+    assert encoding == "gzip"
+    assert orjson.loads(gzip.decompress(body))[0]["title"] == "The Rainbow Serpent"
+
+
+def test_refused_coding_is_not_used(client, local_storage):
+    add_story(local_storage)
+    encoding, _ = raw_body(client, "/api/stories", "br;q=0, gzip")
+    assert encoding == "gzip"
+    encoding, _ = raw_body(client, "/api/stories", "br;q=0, gzip;q=0")
+    assert encoding is None
+
+
+def test_small_bodies_are_not_compressed(client):
+    encoding, body = raw_body(client, "/api/", "br, gzip")
+    assert encoding is None
+    assert orjson.loads(body) == {"message": "Hello World"}
+
+
+def test_story_list_and_detail_shape(client, local_storage):
+    story_id = add_story(local_storage, text="Short")
+
+    stories = client.get("/api/stories").json()
+    assert len(stories) == 1
+    assert stories[0]["_id"] == story_id
+    assert stories[0]["created_at"] == "2026-01-01T12:30:00"
+    assert stories[0]["storyText"] == "Short"
+
+    story = client.get(f"/api/stories/{story_id}").json()
+    assert story == stories[0]
+    assert client.get(f"/api/stories/{ObjectId()}").json() == {"error": "Story not found"}
+    assert client.get("/api/stories/not-an-id").json() == {"error": "Story not found"}
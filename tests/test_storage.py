@@ -0,0 +1,231 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import storage as storage_module
+from storage import AppendOnlyLog, LocalStorage
+
+
+def insert(storage, **fields):
+    story = {"culture": "Maori", "status": "pending", "created_at": datetime(2026, 1, 1)}
+    story.update(fields)
+    return asyncio.run(storage.insert_story(story))
+
+
+def stories_log(data_dir):
+    return data_dir / "stories" / "stories.ndjson"
+
+
+def test_replay_after_restart(tmp_path):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    story_id = insert(storage, title="Maui and the Sun")
+    asyncio.run(storage.update_stories([(story_id, {"status": "approved", "moderated_at": datetime(2026, 1, 2)})]))
+    asyncio.run(storage.insert_contact({"name": "Aroha", "created_at": datetime(2026, 1, 3)}))
+    asyncio.run(storage.insert_status_check({"id": "check-1", "client_name": "cli", "timestamp": datetime(2026, 1, 4)}))
+    storage.close()
+
+    storage = LocalStorage(data_dir)
+    story = asyncio.run(storage.get_story(story_id))
+    assert story["title"] == "Maui and the Sun"
+    assert story["status"] == "approved"
+    assert story["moderated_at"] == datetime(2026, 1, 2)
+    assert len(storage.contacts.docs) == 1
+    assert asyncio.run(storage.list_status_checks(10))[0]["timestamp"] == datetime(2026, 1, 4)
+    storage.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    story_id = insert(storage)
+    storage.close()
+    intact_size = stories_log(data_dir).stat().st_size
+    with open(stories_log(data_dir), "ab") as f:
+        f.write(b'{"op":"put","id":"5f')
+
+    storage = LocalStorage(data_dir)
+    assert list(storage.stories.docs) == [story_id]
+    assert stories_log(data_dir).stat().st_size == intact_size
+    second_id = insert(storage)
+    storage.close()
+
+    storage = LocalStorage(data_dir)
+    assert list(storage.stories.docs) == [story_id, second_id]
+    storage.close()
+
+
+def test_blank_lines_are_skipped(tmp_path):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    ids = [insert(storage) for _ in range(2)]
+    storage.close()
+    lines = stories_log(data_dir).read_bytes().splitlines(keepends=True)
+    stories_log(data_dir).write_bytes(lines[0] + b"\n" + lines[1])
+
+    storage = LocalStorage(data_dir)
+    assert list(storage.stories.docs) == ids
+    storage.close()
+
+
+def test_corrupt_record_mid_log_raises(tmp_path):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    insert(storage)
+    storage.close()
+    with open(stories_log(data_dir), "ab") as f:
+        f.write(b"garbage\n")
+    contents = stories_log(data_dir).read_bytes()
+
+    with pytest.raises(ValueError):
+        LocalStorage(data_dir)
+    assert stories_log(data_dir).read_bytes() == contents
+
+
+def test_failed_write_leaves_no_fragment(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    story_id = insert(storage)
+    size = stories_log(data_dir).stat().st_size
+
+    def fail_fsync(fd):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(storage_module.os, "fsync", fail_fsync)
+    with pytest.raises(OSError):
+        insert(storage)
+    monkeypatch.undo()
+
+    assert stories_log(data_dir).stat().st_size == size
+    assert list(storage.stories.docs) == [story_id]
+    second_id = insert(storage)
+    storage.close()
+
+    storage = LocalStorage(data_dir)
+    assert list(storage.stories.docs) == [story_id, second_id]
+    storage.close()
+
+
+def test_compaction_after_superseded_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(AppendOnlyLog, "COMPACT_MIN_RECORDS", 10)
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    ids = [insert(storage) for _ in range(15)]
+    assert storage.stories.records == 15
+
+    approve = [(story_id, {"status": "approved"}) for story_id in ids[:10]]
+    assert asyncio.run(storage.update_stories(approve)) == 10
+    assert storage.stories.records == 15
+    assert len(stories_log(data_dir).read_bytes().splitlines()) == 15
+    storage.close()
+
+    storage = LocalStorage(data_dir)
+    assert [story["status"] for story in storage.stories.docs.values()] == ["approved"] * 10 + ["pending"] * 5
+    storage.close()
+
+
+def test_compaction_on_startup(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    ids = [insert(storage) for _ in range(5)]
+    asyncio.run(storage.update_stories([(story_id, {"status": "rejected"}) for story_id in ids]))
+    storage.close()
+    assert len(stories_log(data_dir).read_bytes().splitlines()) == 10
+
+    monkeypatch.setattr(AppendOnlyLog, "COMPACT_MIN_RECORDS", 5)
+    storage = LocalStorage(data_dir)
+    assert len(stories_log(data_dir).read_bytes().splitlines()) == 5
+    assert all(story["status"] == "rejected" for story in storage.stories.docs.values())
+    storage.close()
+
+
+def test_list_stories_filters_with_skip_and_limit(local_storage):
+    start = datetime(2026, 1, 1)
+    ids = {}
+    for i, (culture, status) in enumerate([
+        ("Maori", "approved"), ("Sami", "approved"), ("Maori", "pending"),
+        ("Maori", "approved"), ("Sami", "pending"), ("Maori", "approved"),
+    ]):
+        ids[i] = insert(local_storage, culture=culture, status=status, created_at=start + timedelta(hours=i))
+
+    def listed(skip, limit, filters):
+        stories = asyncio.run(local_storage.list_stories(skip, limit, filters))
+        return [story["_id"] for story in stories]
+
+    assert listed(0, 10, {"culture": "Maori"}) == [ids[0], ids[2], ids[3], ids[5]]
+    assert listed(1, 2, {"culture": "Maori"}) == [ids[2], ids[3]]
+    assert listed(0, 10, {"status": "pending"}) == [ids[2], ids[4]]
+    assert listed(1, 1, {"culture": "Maori", "status": "approved"}) == [ids[3]]
+    assert listed(2, 2, {}) == [ids[2], ids[3]]
+    assert listed(0, 10, {"culture": "Inuit"}) == []
+
+
+def test_list_pending_cursor_ordering(local_storage):
+    start = datetime(2026, 1, 1)
+    # Out-of-order inserts and a created_at tie broken by id
+    late = insert(local_storage, created_at=start + timedelta(hours=2))
+    tie_a = insert(local_storage, created_at=start + timedelta(hours=1))
+    tie_b = insert(local_storage, created_at=start + timedelta(hours=1))
+    insert(local_storage, created_at=start, status="approved")
+    first = insert(local_storage, created_at=start)
+
+    page = asyncio.run(local_storage.list_pending(None, 2))
+    assert [story["_id"] for story in page] == [first, min(tie_a, tie_b)]
+
+    cursor = (page[-1]["created_at"], page[-1]["_id"])
+    page = asyncio.run(local_storage.list_pending(cursor, 10))
+    assert [story["_id"] for story in page] == [max(tie_a, tie_b), late]
+
+
+def test_failed_compaction_keeps_accepting_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(AppendOnlyLog, "COMPACT_MIN_RECORDS", 2)
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    ids = [insert(storage) for _ in range(2)]
+
+    def fail_replace(src, dst):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(storage_module.os, "replace", fail_replace)
+    assert asyncio.run(storage.update_stories([(story_id, {"status": "approved"}) for story_id in ids])) == 2
+    assert not list(stories_log(data_dir).parent.glob("*.compact"))
+
+    # Compaction keeps failing, but the insert commits and is indexed
+    third = insert(storage, culture="Sami")
+    assert [story["_id"] for story in asyncio.run(storage.list_stories(0, 10, {"culture": "Sami"}))] == [third]
+    monkeypatch.undo()
+    storage.close()
+
+    storage = LocalStorage(data_dir)
+    assert list(storage.stories.docs) == ids + [third]
+    assert all(storage.stories.docs[story_id]["status"] == "approved" for story_id in ids)
+    storage.close()
+
+
+def test_culture_listing_order_survives_restart(tmp_path):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    newer = insert(storage, created_at=datetime(2026, 1, 2))
+    older = insert(storage, created_at=datetime(2026, 1, 1))
+
+    def listed(filters):
+        return [story["_id"] for story in asyncio.run(storage.list_stories(0, 10, filters))]
+
+    assert listed({"culture": "Maori"}) == listed({}) == [older, newer]
+    storage.close()
+
+    storage = LocalStorage(data_dir)
+    assert listed({"culture": "Maori"}) == listed({}) == [older, newer]
+    storage.close()
+
+
+def test_log_is_locked_against_other_processes(tmp_path):
+    data_dir = tmp_path / "data"
+    storage = LocalStorage(data_dir)
+    with pytest.raises(RuntimeError, match="in use by another process"):
+        LocalStorage(data_dir)
+    storage.close()
+
+    # Released on close, including by the failed open above
+    LocalStorage(data_dir).close()
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from story_snapshot import CURRENT_FILE, StorySnapshot, build_snapshot
+
+
+def add_story(storage, **fields):
+    story = {
+        "culture": "Maori",
+        "language": "Te Reo",
+        "status": "pending",
+        "created_at": datetime(2026, 1, 1, 12),
+        "listeners": 0,
+        "rating": 0,
+    }
+    story.update(fields)
+    return asyncio.run(storage.insert_story(story))
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    return tmp_path / "snapshots"
+
+
+def build(storage, snapshot_dir):
+    return StorySnapshot(asyncio.run(build_snapshot(storage, snapshot_dir)))
+
+
+def test_categoricals_are_dictionary_encoded(local_storage, snapshot_dir):
+    add_story(local_storage, culture="Maori")
+    add_story(local_storage, culture="Sami")
+    add_story(local_storage, culture="Maori")
+
+    snapshot = build(local_storage, snapshot_dir)
+    assert snapshot.vocabularies["culture"] == ["Maori", "Sami"]
+    assert snapshot.columns["culture"].dtype == np.int32
+    assert snapshot.columns["culture"].tolist() == [0, 1, 0]
+
+
+def test_facets_apply_filter_masks(local_storage, snapshot_dir):
+    add_story(local_storage, culture="Maori", status="approved")
+    add_story(local_storage, culture="Sami", status="approved")
+    add_story(local_storage, culture="Maori", status="pending")
+
+    snapshot = build(local_storage, snapshot_dir)
+    assert snapshot.facets(["culture"], {}) == {"culture": {"Maori": 2, "Sami": 1}}
+    assert snapshot.facets(["culture"], {"status": "approved"}) == {"culture": {"Maori": 1, "Sami": 1}}
+    assert snapshot.facets(["culture"], {"status": "approved", "culture": "Sami"}) == {"culture": {"Sami": 1}}
+    assert snapshot.facets(["culture"], {"status": "archived"}) == {"culture": {}}
+
+
+def test_missing_and_unknown_facet_values_are_merged(local_storage, snapshot_dir):
+    add_story(local_storage, region="")
+    add_story(local_storage, region="unknown")
+    add_story(local_storage, region="Arctic")
+
+    snapshot = build(local_storage, snapshot_dir)
+    assert snapshot.facets(["region"], {}) == {"region": {"unknown": 2, "Arctic": 1}}
+
+
+def test_histogram_edges(local_storage, snapshot_dir):
+    for rating in (1, 2, 3, 4):
+        add_story(local_storage, rating=rating)
+
+    snapshot = build(local_storage, snapshot_dir)
+    assert snapshot.histogram("rating", 3, {}) == {"counts": [1, 1, 2], "edges": [1.0, 2.0, 3.0, 4.0]}
+    assert snapshot.histogram("rating", 3, {"culture": "Sami"}) == {"counts": [], "edges": []}
+
+
+def test_created_at_histogram_is_utc_regardless_of_local_timezone(local_storage, snapshot_dir, monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        add_story(local_storage, created_at=datetime(2026, 1, 1, 12))
+        add_story(local_storage, created_at=datetime(2026, 1, 1, 14))
+        snapshot = build(local_storage, snapshot_dir)
+        assert snapshot.histogram("created_at", 2, {}) == {
+            "counts": [1, 1],
+            "edges": ["2026-01-01T12:00:00", "2026-01-01T13:00:00", "2026-01-01T14:00:00"],
+        }
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+
+
+def test_load_falls_back_when_current_version_is_missing(local_storage, snapshot_dir):
+    add_story(local_storage)
+    version_dir = asyncio.run(build_snapshot(local_storage, snapshot_dir))
+    assert StorySnapshot.load(snapshot_dir).size == 1
+
+    os.remove(version_dir / "culture.json")
+    assert StorySnapshot.load(snapshot_dir) is None
+
+    shutil.rmtree(version_dir)
+    assert StorySnapshot.load(snapshot_dir) is None
+    assert (snapshot_dir / CURRENT_FILE).exists()
+
+
+def test_unknown_filter_matches_missing_values(local_storage, snapshot_dir):
+    for region in ("", "unknown", "Arctic", None):
+        add_story(local_storage, region=region, status="approved")
+
+    snapshot = build(local_storage, snapshot_dir)
+    assert snapshot.facets(["region"], {}) == {"region": {"unknown": 3, "Arctic": 1}}
+    assert snapshot.facets(["status"], {"region": "unknown"}) == {"status": {"approved": 3}}
+    assert snapshot.facets(["status"], {"region": "Arctic"}) == {"status": {"approved": 1}}